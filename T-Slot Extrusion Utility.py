@@ -1,77 +1,85 @@
-# T-Slot Extrusion Utility (robust combine-cut version, tool bodies collection fix)
-# - Two sketches: outer bar and slot geometry
-# - Solid extrude: symmetric about sketch plane
-# - Slots: symmetric distance cut (> half-length)
-# - Center bore & end taps: extrude tool bodies, then Combine->Cut (with ObjectCollection)
+# T-Slot Extrusion Utility (single-profile section version)
+# - One sketch: outer bar and slots drawn as a single closed outline
+# - Solid extrude: symmetric about sketch plane, slots included (no slot cut)
+# - Center bore & end taps: cut extrudes limited to the bar body (no tool bodies)
 # - Clean termination via Destroy handler
 
 import adsk.core, adsk.fusion, adsk.cam, traceback, math
+from collections import namedtuple
+from contextlib import contextmanager
 
 _app = None
 _ui  = None
 
+# Shared geometry constants, created in run() once the API is up
+_ORIGIN = None
+_IDENTITY = None
+
 # ---- Profile Library ---------------------------------------------------------
+Profile = namedtuple('Profile', 'unit width height slot_center_from_face slot_depth '
+                                'slot_neck slot_open center_bore_d end_tap_d')
+
 PROFILES = {
-    '80/20 1010 (1" x 1")': {
-        'unit': 'in', 'width': 1.0, 'height': 1.0,
-        'slot_center_from_face': 0.25,
-        'slot_depth': 0.28, 'slot_neck': 0.26, 'slot_open': 0.20,
-        'center_bore_d': 0.201, 'end_tap_d': 0.159,
-    },
-    '80/20 1020 (1" x 2")': {
-        'unit': 'in', 'width': 2.0, 'height': 1.0,
-        'slot_center_from_face': 0.25,
-        'slot_depth': 0.28, 'slot_neck': 0.26, 'slot_open': 0.20,
-        'center_bore_d': 0.201, 'end_tap_d': 0.159,
-    },
-    '80/20 1515 (1.5" x 1.5")': {
-        'unit': 'in', 'width': 1.5, 'height': 1.5,
-        'slot_center_from_face': 0.375,
-        'slot_depth': 0.40, 'slot_neck': 0.32, 'slot_open': 0.26,
-        'center_bore_d': 0.257, 'end_tap_d': 0.257,
-    },
-    '80/20 1530 (1.5" x 3.0")': {
-        'unit': 'in', 'width': 3.0, 'height': 1.5,
-        'slot_center_from_face': 0.375,
-        'slot_depth': 0.40, 'slot_neck': 0.32, 'slot_open': 0.26,
-        'center_bore_d': 0.257, 'end_tap_d': 0.257,
-    },
-    '80/20 25-2525 (25 x 25 mm)': {
-        'unit': 'mm', 'width': 25.0, 'height': 25.0,
-        'slot_center_from_face': 6.5,
-        'slot_depth': 7.5, 'slot_neck': 6.0, 'slot_open': 5.0,
-        'center_bore_d': 5.2, 'end_tap_d': 4.2,
-    },
-    '80/20 25-2550 (25 x 50 mm)': {
-        'unit': 'mm', 'width': 50.0, 'height': 25.0,
-        'slot_center_from_face': 6.5,
-        'slot_depth': 7.5, 'slot_neck': 6.0, 'slot_open': 5.0,
-        'center_bore_d': 5.2, 'end_tap_d': 4.2,
-    },
-    'Misumi 3030 (30 x 30 mm)': {
-        'unit': 'mm', 'width': 30.0, 'height': 30.0,
-        'slot_center_from_face': 7.5,
-        'slot_depth': 8.5, 'slot_neck': 6.8, 'slot_open': 6.0,
-        'center_bore_d': 5.5, 'end_tap_d': 4.5,
-    },
-    'Misumi 4545 (45 x 45 mm)': {
-        'unit': 'mm', 'width': 45.0, 'height': 45.0,
-        'slot_center_from_face': 10.5,
-        'slot_depth': 11.0, 'slot_neck': 8.2, 'slot_open': 7.0,
-        'center_bore_d': 6.8, 'end_tap_d': 6.8,
-    },
-    'Bosch 30x30 (30 x 30 mm)': {
-        'unit': 'mm', 'width': 30.0, 'height': 30.0,
-        'slot_center_from_face': 7.5,
-        'slot_depth': 8.5, 'slot_neck': 6.8, 'slot_open': 6.0,
-        'center_bore_d': 5.5, 'end_tap_d': 4.5,
-    },
-    'Bosch 45x45 (45 x 45 mm)': {
-        'unit': 'mm', 'width': 45.0, 'height': 45.0,
-        'slot_center_from_face': 10.5,
-        'slot_depth': 11.0, 'slot_neck': 8.2, 'slot_open': 7.0,
-        'center_bore_d': 6.8, 'end_tap_d': 6.8,
-    },
+    '80/20 1010 (1" x 1")': Profile(
+        unit='in', width=1.0, height=1.0,
+        slot_center_from_face=0.25,
+        slot_depth=0.28, slot_neck=0.26, slot_open=0.20,
+        center_bore_d=0.201, end_tap_d=0.159,
+    ),
+    '80/20 1020 (1" x 2")': Profile(
+        unit='in', width=2.0, height=1.0,
+        slot_center_from_face=0.25,
+        slot_depth=0.28, slot_neck=0.26, slot_open=0.20,
+        center_bore_d=0.201, end_tap_d=0.159,
+    ),
+    '80/20 1515 (1.5" x 1.5")': Profile(
+        unit='in', width=1.5, height=1.5,
+        slot_center_from_face=0.375,
+        slot_depth=0.40, slot_neck=0.32, slot_open=0.26,
+        center_bore_d=0.257, end_tap_d=0.257,
+    ),
+    '80/20 1530 (1.5" x 3.0")': Profile(
+        unit='in', width=3.0, height=1.5,
+        slot_center_from_face=0.375,
+        slot_depth=0.40, slot_neck=0.32, slot_open=0.26,
+        center_bore_d=0.257, end_tap_d=0.257,
+    ),
+    '80/20 25-2525 (25 x 25 mm)': Profile(
+        unit='mm', width=25.0, height=25.0,
+        slot_center_from_face=6.5,
+        slot_depth=7.5, slot_neck=6.0, slot_open=5.0,
+        center_bore_d=5.2, end_tap_d=4.2,
+    ),
+    '80/20 25-2550 (25 x 50 mm)': Profile(
+        unit='mm', width=50.0, height=25.0,
+        slot_center_from_face=6.5,
+        slot_depth=7.5, slot_neck=6.0, slot_open=5.0,
+        center_bore_d=5.2, end_tap_d=4.2,
+    ),
+    'Misumi 3030 (30 x 30 mm)': Profile(
+        unit='mm', width=30.0, height=30.0,
+        slot_center_from_face=7.5,
+        slot_depth=8.5, slot_neck=6.8, slot_open=6.0,
+        center_bore_d=5.5, end_tap_d=4.5,
+    ),
+    'Misumi 4545 (45 x 45 mm)': Profile(
+        unit='mm', width=45.0, height=45.0,
+        slot_center_from_face=10.5,
+        slot_depth=11.0, slot_neck=8.2, slot_open=7.0,
+        center_bore_d=6.8, end_tap_d=6.8,
+    ),
+    'Bosch 30x30 (30 x 30 mm)': Profile(
+        unit='mm', width=30.0, height=30.0,
+        slot_center_from_face=7.5,
+        slot_depth=8.5, slot_neck=6.8, slot_open=6.0,
+        center_bore_d=5.5, end_tap_d=4.5,
+    ),
+    'Bosch 45x45 (45 x 45 mm)': Profile(
+        unit='mm', width=45.0, height=45.0,
+        slot_center_from_face=10.5,
+        slot_depth=11.0, slot_neck=8.2, slot_open=7.0,
+        center_bore_d=6.8, end_tap_d=6.8,
+    ),
 }
 
 # ---- Dialog Defaults ---------------------------------------------------------
@@ -81,260 +89,266 @@ DEFAULT_CENTER_BORE = False
 DEFAULT_END_TAPS = False
 DEFAULT_CONSTRUCTION = True
 
-_handlers = []
+# Fusion's internal length unit is cm (what ValueInput.createByReal expects)
+_PILOT_DEPTH_CM = 2.0  # 20 mm end-tap pilot depth
+_DEFAULT_LEN_CM = DEFAULT_LENGTH_MM / 10.0
+
+_PROFILE_NAMES = list(PROFILES.keys())
+_DEFAULT_IDX = _PROFILE_NAMES.index(DEFAULT_PROFILE)
+
+_handlers = []  # long-lived handlers registered once per run()
 
 # ---- Helpers ----------------------------------------------------------------
-def toDocUnits(val, unitSymbol, des):
-    um = des.unitsManager
+def toDocUnits(val, unitSymbol, um):
     expr = f'{val} in' if unitSymbol == 'in' else f'{val} mm'
     return um.evaluateExpression(expr, um.defaultLengthUnits)
 
-def draw_outer_rect(sketch, prof):
-    ln = sketch.sketchCurves.sketchLines
-    des = adsk.fusion.Design.cast(_app.activeProduct)
-
-    w = toDocUnits(prof['width'],  prof['unit'], des)
-    h = toDocUnits(prof['height'], prof['unit'], des)
-    x = w * 0.5; y = h * 0.5
+class ProfileDoc:
+    """Profile dimensions converted once per execution to document units."""
+    __slots__ = ('w', 'h', 'slot_depth', 'neck', 'open', 'off', 'center_d', 'endtap_d', 'x', 'y')
+    def __init__(self, prof, um):
+        unit = prof.unit
+        self.w          = toDocUnits(prof.width, unit, um)
+        self.h          = toDocUnits(prof.height, unit, um)
+        self.slot_depth = toDocUnits(prof.slot_depth, unit, um)
+        self.neck       = toDocUnits(prof.slot_neck, unit, um)
+        self.open       = toDocUnits(prof.slot_open, unit, um)
+        self.off        = toDocUnits(prof.slot_center_from_face, unit, um)
+        self.center_d   = toDocUnits(prof.center_bore_d, unit, um)
+        self.endtap_d   = toDocUnits(prof.end_tap_d, unit, um)
+        self.x = self.w * 0.5; self.y = self.h * 0.5
+
+@contextmanager
+def deferred_compute(sketch):
+    """Suspend sketch solving while geometry is added; always re-enable it afterwards."""
+    sketch.isComputeDeferred = True
+    try:
+        yield sketch
+    finally:
+        sketch.isComputeDeferred = False
 
-    p1 = adsk.core.Point3D.create(-x, -y, 0)
-    p2 = adsk.core.Point3D.create( x, -y, 0)
-    p3 = adsk.core.Point3D.create( x,  y, 0)
-    p4 = adsk.core.Point3D.create(-x,  y, 0)
-    ln.addByTwoPoints(p1, p2); ln.addByTwoPoints(p2, p3)
-    ln.addByTwoPoints(p3, p4); ln.addByTwoPoints(p4, p1)
+def as_list(coll):
+    """Snapshot an API collection into a Python list (one item() call per element)."""
+    return [coll.item(i) for i in range(coll.count)]
 
-    profs = sketch.profiles
-    outer_prof, max_area = None, -1.0
-    for i in range(profs.count):
-        p = profs.item(i)
-        a = abs(p.areaProperties(adsk.fusion.CalculationAccuracy.MediumCalculationAccuracy).area)
-        if a > max_area and a < 1e8:  # ignore unbounded outside
-            max_area = a
-            outer_prof = p
-    return outer_prof, w, h
-
-def draw_slots(sketch, prof):
+def draw_section(sketch, pd):
+    """Draw the slotted cross-section as one closed outline and return its profile."""
     ln = sketch.sketchCurves.sketchLines
-    des = adsk.fusion.Design.cast(_app.activeProduct)
-
-    w = toDocUnits(prof['width'],  prof['unit'], des)
-    h = toDocUnits(prof['height'], prof['unit'], des)
-    slot_depth = toDocUnits(prof['slot_depth'], prof['unit'], des)
-    neck_w    = toDocUnits(prof['slot_neck'], prof['unit'], des)
-    open_w    = toDocUnits(prof['slot_open'], prof['unit'], des)
+    slot_depth = pd.slot_depth
+    n = pd.neck / 2
+    o = pd.open / 2
 
-    x = w * 0.5; y = h * 0.5
+    x = pd.x; y = pd.y
     d_open = min(slot_depth * 0.35, slot_depth - 1e-6)
 
-    def rect(x1,y1,x2,y2):
-        ln.addByTwoPoints(adsk.core.Point3D.create(x1,y1,0), adsk.core.Point3D.create(x2,y1,0))
-        ln.addByTwoPoints(adsk.core.Point3D.create(x2,y1,0), adsk.core.Point3D.create(x2,y2,0))
-        ln.addByTwoPoints(adsk.core.Point3D.create(x2,y2,0), adsk.core.Point3D.create(x1,y2,0))
-        ln.addByTwoPoints(adsk.core.Point3D.create(x1,y2,0), adsk.core.Point3D.create(x1,y1,0))
-
-    # Right (x=+x, inward -X)
-    rect( x, -open_w/2,  x - d_open,  open_w/2)
-    rect( x - d_open, -neck_w/2,  x - slot_depth,  neck_w/2)
-    # Left  (x=-x, inward +X)
-    rect(-x, -open_w/2, -x + d_open,  open_w/2)
-    rect(-x + d_open, -neck_w/2, -x + slot_depth,  neck_w/2)
-    # Top   (y=+y, inward -Y)
-    rect(-open_w/2,  y,  open_w/2,  y - d_open)
-    rect(-neck_w/2,  y - d_open,  neck_w/2,  y - slot_depth)
-    # Bottom(y=-y, inward +Y)
-    rect(-open_w/2, -y,  open_w/2, -y + d_open)
-    rect(-neck_w/2, -y + d_open,  neck_w/2, -y + slot_depth)
-
-    coll = adsk.core.ObjectCollection.create()
+    # T-slot notch walked along a face: (depth inward, offset along the face)
+    notch = ((0, -o), (d_open, -o), (d_open, -n), (slot_depth, -n),
+             (slot_depth, n), (d_open, n), (d_open, o), (0, o))
+    pts = [(x, -y)]
+    pts += [( x - a,  b) for a, b in notch]  # Right (x=+x, inward -X)
+    pts += [( x, y)]
+    pts += [(-b,  y - a) for a, b in notch]  # Top   (y=+y, inward -Y)
+    pts += [(-x, y)]
+    pts += [(-x + a, -b) for a, b in notch]  # Left  (x=-x, inward +X)
+    pts += [(-x, -y)]
+    pts += [( b, -y + a) for a, b in notch]  # Bottom(y=-y, inward +Y)
+
+    # Chain the lines through shared sketch points; solve once at the end
+    with deferred_compute(sketch):
+        first = ln.addByTwoPoints(adsk.core.Point3D.create(*pts[0], 0), adsk.core.Point3D.create(*pts[1], 0))
+        last = first
+        for px, py in pts[2:]:
+            last = ln.addByTwoPoints(last.endSketchPoint, adsk.core.Point3D.create(px, py, 0))
+        ln.addByTwoPoints(last.endSketchPoint, first.startSketchPoint)
+
+    # A single closed loop with the slots on its boundary gives exactly one profile
     profs = sketch.profiles
-    area_cap = 3.0 * float(neck_w * slot_depth)  # likely slot islands
-    for i in range(profs.count):
-        p = profs.item(i)
-        a = abs(p.areaProperties(adsk.fusion.CalculationAccuracy.MediumCalculationAccuracy).area)
-        if 0.0 < a < area_cap:
-            coll.add(p)
-    return coll
-
-def create_construction_for_slots(comp, prof):
-    des = adsk.fusion.Design.cast(_app.activeProduct)
-    unit = prof['unit']
-    w = toDocUnits(prof['width'], unit, des)
-    h = toDocUnits(prof['height'], unit, des)
-    off = toDocUnits(prof['slot_center_from_face'], unit, des)
+    return profs.item(0) if profs.count else None
+
+def create_construction_for_slots(comp, pd):
+    if pd.slot_depth <= 0:
+        return  # no slots, no centerlines to mark
+    x = pd.x; y = pd.y
+    off = pd.off
+    xs = (-x + off, x - off)  # slot centerline offsets, computed once
+    ys = (-y + off, y - off)
 
     planes = comp.constructionPlanes
     axes  = comp.constructionAxes
 
-    for sx in (-w/2 + off, w/2 - off):
-        axisInput = axes.createInput()
-        sp = comp.sketches.add(comp.xYConstructionPlane)
-        pt = sp.sketchPoints.add(adsk.core.Point3D.create(sx, 0, 0))
-        pt2 = sp.sketchPoints.add(adsk.core.Point3D.create(sx, 0, 1))
-        axisInput.setByTwoPoints(pt, pt2)
-        axes.add(axisInput)
-
-    for sy in (-h/2 + off, h/2 - off):
-        axisInput = axes.createInput()
-        sp = comp.sketches.add(comp.xYConstructionPlane)
-        pt = sp.sketchPoints.add(adsk.core.Point3D.create(0, sy, 0))
-        pt2 = sp.sketchPoints.add(adsk.core.Point3D.create(0, sy, 1))
-        axisInput.setByTwoPoints(pt, pt2)
-        axes.add(axisInput)
-
     yz = comp.yZConstructionPlane
     xz = comp.xZConstructionPlane
-    for sx in (-w/2 + off, w/2 - off):
-        ip = planes.createInput(); ip.setByOffset(yz, adsk.core.ValueInput.createByReal(sx)); planes.add(ip)
-    for sy in (-h/2 + off, h/2 - off):
-        ip = planes.createInput(); ip.setByOffset(xz, adsk.core.ValueInput.createByReal(sy)); planes.add(ip)
-
-def make_collection(*bodies_or_lists):
-    """Return an ObjectCollection from bodies or lists/tuples of bodies."""
-    coll = adsk.core.ObjectCollection.create()
-    for item in bodies_or_lists:
-        if item is None: 
+    xPlanes, yPlanes = [], []
+    for sx in xs:
+        ip = planes.createInput(); ip.setByOffset(yz, adsk.core.ValueInput.createByReal(sx)); xPlanes.append(planes.add(ip))
+    for sy in ys:
+        ip = planes.createInput(); ip.setByOffset(xz, adsk.core.ValueInput.createByReal(sy)); yPlanes.append(planes.add(ip))
+
+    # Slot axes run along Z where a slot-center plane meets the opposite origin plane;
+    # no helper sketches needed (an InfiniteLine3D input is only accepted in direct designs).
+    for pl in xPlanes:
+        axisInput = axes.createInput(); axisInput.setByTwoPlanes(pl, xz); axes.add(axisInput)
+    for pl in yPlanes:
+        axisInput = axes.createInput(); axisInput.setByTwoPlanes(pl, yz); axes.add(axisInput)
+
+def find_end_faces(body, length):
+    """Return (posFace, negFace): the planar faces of body with normals along +Z / -Z."""
+    half = length / 2.0  # the symmetric section extrude puts the end caps at z = +/-half
+    posFace, negFace = None, None
+    faces = body.faces
+    for i in range(faces.count):
+        f = faces.item(i)
+        # Only the two end caps sit at +/-half; side faces are centered at z = 0
+        if abs(abs(f.centroid.z) - half) > 1e-6:
             continue
-        if isinstance(item, (list, tuple)):
-            for b in item:
-                if b: coll.add(b)
-        else:
-            coll.add(item)
-    return coll
-
-def combine_cut(comp, target_body, tool_bodies, keep_tool=False):
-    """Boolean cut tool_bodies (single or list) from target_body using Combine."""
-    tools = make_collection(tool_bodies)
-    comb = comp.features.combineFeatures
-    inp = comb.createInput(target_body, tools)  # expects ObjectCollection
-    inp.operation = adsk.fusion.FeatureOperations.CutFeatureOperation
-    inp.isKeepToolBodies = keep_tool
-    comb.add(inp)
-
-def add_center_bore_and_end_taps(comp, prof, length, makeCenterBore, makeEndTaps):
-    des = adsk.fusion.Design.cast(_app.activeProduct)
-    unit = prof['unit']
-    center_d = toDocUnits(prof['center_bore_d'], unit, des)
-    endtap_d = toDocUnits(prof['end_tap_d'], unit, des)
-
-    bodies = comp.bRepBodies
-    if bodies.count == 0:
+        g = f.geometry
+        if g.surfaceType == adsk.core.SurfaceTypes.PlaneSurfaceType:
+            # Parallel to Z <=> no X/Y component; compare floats instead of calling the API
+            n = g.normal
+            nx, ny, nz = n.x, n.y, n.z
+            if abs(nx) < 1e-9 and abs(ny) < 1e-9:
+                if nz > 0.0 and posFace is None: posFace = f
+                elif nz < 0.0 and negFace is None: negFace = f
+        if posFace and negFace:
+            break
+    return posFace, negFace
+
+def circle_profile(sketch, circle):
+    """Return the profile bounded by circle alone, or None if the sketch has none."""
+    for p in as_list(sketch.profiles):
+        # The face-boundary profile has an outer loop plus the circle; reject it on the loop count
+        loops = p.profileLoops
+        if loops.count != 1:
+            continue
+        curves = loops.item(0).profileCurves
+        if curves.count == 1 and curves.item(0).sketchEntity == circle:
+            return p
+    return None
+
+def add_center_bore_and_end_taps(sketches, ext, target, pd, length, makeCenterBore, makeEndTaps):
+    center_d = pd.center_d
+    endtap_d = pd.endtap_d
+
+    # A through bore at least as wide as the pilots leaves them nothing to cut
+    if makeEndTaps and makeCenterBore and endtap_d <= center_d:
+        _app.log('End taps skipped: center bore already covers the tap pilot diameter.')
+        makeEndTaps = False
+
+    # Pilots cut from both ends of a short bar would meet
+    if makeEndTaps and length <= 2.0 * _PILOT_DEPTH_CM + 1e-6:
+        _app.log('End taps skipped: bar is too short for both 20 mm pilots.')
+        makeEndTaps = False
+
+    # No holes to cut (the dialog default): skip the end-face scan entirely
+    if target is None or not (makeCenterBore or makeEndTaps):
         return
-    target = bodies.item(0)
+    posFace, negFace = find_end_faces(target, length)
 
-    # --- Center bore: create tool cylinder as new body, then Combine->Cut ---
+    # Sketch every hole before cutting so no cut invalidates a face still to be sketched on
+    # --- Center bore: one circle on an end face ---
+    bore_prof = None
     if makeCenterBore:
-        zAxis = adsk.core.Vector3D.create(0, 0, 1)
-        posFace, negFace = None, None
-        for f in target.faces:
-            if isinstance(f.geometry, adsk.core.Plane):
-                n = f.geometry.normal
-                if n.isParallelTo(zAxis):
-                    if n.dotProduct(zAxis) > 0.0 and posFace is None: posFace = f
-                    elif n.dotProduct(zAxis) < 0.0 and negFace is None: negFace = f
         startFace = posFace or negFace
         if not startFace:
             raise RuntimeError('No planar end face found for center bore.')
 
-        sk = comp.sketches.add(startFace)
-        sk.sketchCurves.sketchCircles.addByCenterRadius(adsk.core.Point3D.create(0,0,0), center_d/2.0)
-
-        # Inner circle profile
-        profs = sk.profiles
-        inner_prof, min_area = None, None
-        for i in range(profs.count):
-            p = profs.item(i)
-            try:
-                a = abs(p.areaProperties(adsk.fusion.CalculationAccuracy.MediumCalculationAccuracy).area)
-            except:
-                continue
-            if a <= 0: continue
-            if (min_area is None) or (a < min_area):
-                min_area = a; inner_prof = p
-        if inner_prof is None:
-            raise RuntimeError('Center-bore profile not found.')
+        sk = sketches.add(startFace)
+        with deferred_compute(sk):
+            circ = sk.sketchCurves.sketchCircles.addByCenterRadius(_ORIGIN, center_d/2.0)
 
-        # Extrude NEW BODY cylinder longer than the bar
-        w_doc = toDocUnits(prof['width'], unit, des)
-        h_doc = toDocUnits(prof['height'], unit, des)
-        safe_depth = adsk.core.ValueInput.createByReal(float(length) + 2.0 * max(w_doc, h_doc))
+        bore_prof = circle_profile(sk, circ)
+        if bore_prof is None:
+            raise RuntimeError('Center-bore profile not found.')
 
-        ext = comp.features.extrudeFeatures
+    # --- End-tap pilots: one circle on each end face ---
+    tap_profs = []
+    if makeEndTaps:
+        for f in (posFace, negFace):
+            if not f:
+                continue
+            sk = sketches.add(f)
+            with deferred_compute(sk):
+                circ = sk.sketchCurves.sketchCircles.addByCenterRadius(_ORIGIN, endtap_d/2.0)
+            inner_prof = circle_profile(sk, circ)
+            if inner_prof is not None:
+                tap_profs.append(inner_prof)
+
+    # Cut straight into the bar; no tool bodies or Combine needed
+    if bore_prof:
         deg0 = adsk.core.ValueInput.createByString("0 deg")
         extent_all = adsk.fusion.ThroughAllExtentDefinition.create()
-        
-        toolInput = ext.createInput(inner_prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        toolInput.setOneSideExtent(extent_all, adsk.fusion.ExtentDirections.NegativeExtentDirection, deg0)
-        #toolInput.setDistanceExtent(False, safe_depth)
-        toolFeat = ext.add(toolInput)
-        tool_body = toolFeat.bodies.item(0)
 
-        # Boolean cut tool from target (pass an ObjectCollection)
-        combine_cut(comp, target, [tool_body], keep_tool=False)
+        cutInput = ext.createInput(bore_prof, adsk.fusion.FeatureOperations.CutFeatureOperation)
+        cutInput.setOneSideExtent(extent_all, adsk.fusion.ExtentDirections.NegativeExtentDirection, deg0)
+        cutInput.participantBodies = [target]
+        ext.add(cutInput)
 
-    # --- End-tap pilots: also as tool cylinders + combine cut (short) ---
-    if makeEndTaps:
-        zAxis = adsk.core.Vector3D.create(0, 0, 1)
-        endFaces = []
-        for f in target.faces:
-            if isinstance(f.geometry, adsk.core.Plane):
-                n = f.geometry.normal
-                if n.isParallelTo(zAxis):
-                    endFaces.append(f)
-        if len(endFaces) >= 1:
-            pilotDepth = des.unitsManager.evaluateExpression('20 mm', des.unitsManager.defaultLengthUnits)
-
-            tool_bodies = []
-            for f in endFaces:
-                sk = comp.sketches.add(f)
-                sk.sketchCurves.sketchCircles.addByCenterRadius(adsk.core.Point3D.create(0,0,0), endtap_d/2.0)
-
-                # Inner circle profile
-                profs = sk.profiles
-                inner_prof, min_area = None, None
-                for i in range(profs.count):
-                    p = profs.item(i)
-                    try:
-                        a = abs(p.areaProperties(adsk.fusion.CalculationAccuracy.MediumCalculationAccuracy).area)
-                    except:
-                        continue
-                    if a <= 0: continue
-                    if (min_area is None) or (a < min_area):
-                        min_area = a; inner_prof = p
-                if inner_prof is None:
-                    continue
-
-                # Extrude NEW BODY short cylinder
-                ext = comp.features.extrudeFeatures
-                toolInput = ext.createInput(inner_prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-                toolInput.setDistanceExtent(False, adsk.core.ValueInput.createByReal(-1 * pilotDepth))
-                toolFeat = ext.add(toolInput)
-                tool_bodies.append(toolFeat.bodies.item(0))
-
-            if tool_bodies:
-                combine_cut(comp, target, tool_bodies, keep_tool=False)
+    for inner_prof in tap_profs:
+        cutInput = ext.createInput(inner_prof, adsk.fusion.FeatureOperations.CutFeatureOperation)
+        cutInput.setDistanceExtent(False, adsk.core.ValueInput.createByReal(-_PILOT_DEPTH_CM))
+        cutInput.participantBodies = [target]
+        ext.add(cutInput)
+
+def build_bar(comp, pd, length, makeCenterBore, makeEndTaps, makeConstruction):
+    """Sketch, extrude and finish a new bar inside the empty component comp."""
+    sketches = comp.sketches
+    ext = comp.features.extrudeFeatures
+
+    # Sketch: slotted cross-section as one profile
+    sk_section = sketches.add(comp.xYConstructionPlane)
+    sectionProf = draw_section(sk_section, pd)
+    if sectionProf is None:
+        raise RuntimeError('Cross-section profile not found.')
+
+    # Extrude solid (symmetric about sketch plane, full length)
+    extInput = ext.createInput(sectionProf, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+    extInput.setSymmetricExtent(adsk.core.ValueInput.createByReal(length), True)
+    bar = ext.add(extInput).bodies.item(0)
+
+    # Construction features
+    if makeConstruction:
+        create_construction_for_slots(comp, pd)
+
+    # Center bore and end taps (direct cut extrudes)
+    add_center_bore_and_end_taps(sketches, ext, bar, pd, length, makeCenterBore, makeEndTaps)
 
 def apply_appearance_and_name(comp, profName, length_val):
     comp.name = f'{profName} - L={round(length_val,2)}'
     if comp.bRepBodies.count > 0:
         comp.bRepBodies.item(0).name = 'Extrusion'
-    try:
+    if comp.appearance is not None:
+        return
+    try:  # appearance is cosmetic; never fail the build over it
         appLib = _app.materialLibraries.itemByName('Fusion 360 Appearance Library')
         if appLib:
             app = appLib.appearances.itemByName('Aluminum - Anodized (Clear)') or appLib.appearances.itemByName('Aluminum - Satin')
-            if app and comp.appearance is None:
+            if app:
                 comp.appearance = app
-    except:
+    except RuntimeError:
         pass
 
+def group_timeline(des, startIndex, name):
+    """Collapse the timeline items added since startIndex into one named group (None: no timeline)."""
+    if startIndex is None:
+        return
+    tl = des.timeline
+    endIndex = tl.markerPosition - 1
+    if endIndex > startIndex:
+        grp = tl.timelineGroups.add(startIndex, endIndex)
+        grp.name = name
+        grp.isCollapsed = True
+
 # ---- Command UI / Event Handlers --------------------------------------------
 class CommandExecuteHandler(adsk.core.CommandEventHandler):
-    def __init__(self): super().__init__(); _handlers.append(self)
+    def __init__(self, des=None): super().__init__(); self._des = des
     def notify(self, args):
         try:
-            des = adsk.fusion.Design.cast(_app.activeProduct)
+            des = self._des  # resolved when the command was created
+            if not (des and des.isValid):
+                des = adsk.fusion.Design.cast(_app.activeProduct)
             if not des:
                 _ui.messageBox('Please switch to the Design workspace.'); return
+            um = des.unitsManager
 
             cmd = args.firingEvent.sender
             inputs = cmd.commandInputs
@@ -342,6 +356,7 @@ class CommandExecuteHandler(adsk.core.CommandEventHandler):
             dd = adsk.core.DropDownCommandInput.cast(inputs.itemById('profile'))
             profileName = dd.selectedItem.name if dd and dd.selectedItem else DEFAULT_PROFILE
             profile = PROFILES[profileName]
+            pd = ProfileDoc(profile, um)
 
             lenInput = adsk.core.ValueCommandInput.cast(inputs.itemById('length'))
             length_val = lenInput.value
@@ -350,65 +365,44 @@ class CommandExecuteHandler(adsk.core.CommandEventHandler):
             cbEnd = adsk.core.BoolValueCommandInput.cast(inputs.itemById('endTaps'))
             cbConst = adsk.core.BoolValueCommandInput.cast(inputs.itemById('construct'))
 
+            # Direct-modeling designs have no timeline to group
+            parametric = des.designType == adsk.fusion.DesignTypes.ParametricDesignType
+            tlStart = des.timeline.markerPosition if parametric else None
+
             root = des.rootComponent
-            occ = root.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+            occ = root.occurrences.addNewComponent(_IDENTITY)
             comp = adsk.fusion.Component.cast(occ.component)
-
-            # Sketch 1: outer bar
-            sk_outer = comp.sketches.add(comp.xYConstructionPlane)
-            outerProf, w, h = draw_outer_rect(sk_outer, profile)
-
-            # Extrude solid (symmetric about sketch plane)
-            ext = comp.features.extrudeFeatures
-            extInput = ext.createInput(outerProf, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-            half = adsk.core.ValueInput.createByReal(length_val/2.0)
-            extInput.setSymmetricExtent(half, True)
-            ext.add(extInput)
-
-            # Sketch 2: slots, then symmetric distance cut (> half length)
-            sk_slots = comp.sketches.add(comp.xYConstructionPlane)
-            slotProfiles = draw_slots(sk_slots, profile)
-            if slotProfiles and slotProfiles.count > 0:
-                depth = adsk.core.ValueInput.createByReal((length_val/2.0) + max(w, h))
-                cutInput = ext.createInput(slotProfiles, adsk.fusion.FeatureOperations.CutFeatureOperation)
-                cutInput.setSymmetricExtent(depth, True)
-                ext.add(cutInput)
-
-            # Construction features
-            if cbConst.value:
-                create_construction_for_slots(comp, profile)
-
-            # Center bore and end taps (via tool bodies + combine cut)
-            add_center_bore_and_end_taps(comp, profile, length_val, cbCenter.value, cbEnd.value)
+            build_bar(comp, pd, length_val, cbCenter.value, cbEnd.value, cbConst.value)
 
             # Naming/appearance
             apply_appearance_and_name(comp, profileName, length_val)
+            group_timeline(des, tlStart, comp.name)
 
-            _ui.messageBox('T-slot extrusion created successfully.')
+            _app.log(f'T-slot extrusion created: {comp.name}')  # non-modal; only failures use a message box
         except:
             if _ui: _ui.messageBox('Execute Failed:\n{}'.format(traceback.format_exc()))
 
 class CommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
-    def __init__(self): super().__init__(); _handlers.append(self)
+    def __init__(self): super().__init__(); self._cmdHandlers = []
     def notify(self, args):
         try:
             cmd = adsk.core.Command.cast(args.command)
             cmd.isRepeatable = True
-            cmd.execute.add(CommandExecuteHandler())
-            cmd.destroy.add(CommandDestroyHandler('TSlotExtrusionUtility'))
+            des = adsk.fusion.Design.cast(_app.activeProduct)
+            # Keep only the current command's handlers alive; earlier commands are finished
+            self._cmdHandlers = [CommandExecuteHandler(des), CommandDestroyHandler('TSlotExtrusionUtility')]
+            cmd.execute.add(self._cmdHandlers[0])
+            cmd.destroy.add(self._cmdHandlers[1])
 
             inputs = cmd.commandInputs
             dd = inputs.addDropDownCommandInput('profile', 'Profile', adsk.core.DropDownStyles.TextListDropDownStyle)
-            for name in PROFILES.keys():
-                dd.listItems.add(name, name == DEFAULT_PROFILE, '')
+            for i, name in enumerate(_PROFILE_NAMES):
+                dd.listItems.add(name, i == _DEFAULT_IDX, '')
             dd.tooltip = 'Choose a standard extrusion profile.'
 
-            des = adsk.fusion.Design.cast(_app.activeProduct)
             um = des.unitsManager if des else None
-            defaultLen = DEFAULT_LENGTH_MM
-            if um: defaultLen = um.evaluateExpression(f'{DEFAULT_LENGTH_MM} mm', um.defaultLengthUnits)
-            inputs.addValueInput('length', 'Length', des.unitsManager.defaultLengthUnits if des else 'mm',
-                                 adsk.core.ValueInput.createByReal(defaultLen))
+            inputs.addValueInput('length', 'Length', um.defaultLengthUnits if um else 'mm',
+                                 adsk.core.ValueInput.createByReal(_DEFAULT_LEN_CM))
 
             inputs.addBoolValueInput('centerBore', 'Add center bore (through)', True, '', DEFAULT_CENTER_BORE)
             inputs.addBoolValueInput('endTaps', 'Add end tap pilot holes (both ends)', True, '', DEFAULT_END_TAPS)
@@ -417,7 +411,7 @@ class CommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             if _ui: _ui.messageBox('CommandCreated Failed:\n{}'.format(traceback.format_exc()))
 
 class CommandDestroyHandler(adsk.core.CommandEventHandler):
-    def __init__(self, cmdDefId): super().__init__(); _handlers.append(self); self._cmdDefId = cmdDefId
+    def __init__(self, cmdDefId): super().__init__(); self._cmdDefId = cmdDefId
     def notify(self, args: adsk.core.CommandEventArgs):
         try:
             if _ui:
@@ -428,10 +422,12 @@ class CommandDestroyHandler(adsk.core.CommandEventHandler):
 
 # ---- Script entry/exit -------------------------------------------------------
 def run(context):
-    global _app, _ui
+    global _app, _ui, _ORIGIN, _IDENTITY
     try:
         _app = adsk.core.Application.get()
         _ui = _app.userInterface
+        _ORIGIN = adsk.core.Point3D.create(0, 0, 0)
+        _IDENTITY = adsk.core.Matrix3D.create()
 
         cmdDef = _ui.commandDefinitions.itemById('TSlotExtrusionUtility')
         if not cmdDef:
@@ -440,8 +436,9 @@ def run(context):
                 'T-Slot Extrusion Utility',
                 'Create a standard aluminum T-slot extrusion with adjustable length and options.'
             )
-
-        cmdDef.commandCreated.add(CommandCreatedHandler())
+            onCreated = CommandCreatedHandler()
+            cmdDef.commandCreated.add(onCreated)
+            _handlers.append(onCreated)
         cmdDef.execute()
         adsk.autoTerminate(False)
     except: